@@ -1,17 +1,39 @@
 import os
+import re
 import logging
 from dataclasses import dataclass
 
 @dataclass
 class Config:
     DATABASE_URL: str
+    DATABASE_SHARDS: dict[str, str]
+    REBALANCE_PENDING: bool
     DEBUG: bool
     SECRET_KEY: str
     LOG_LEVEL: str
 
+def parse_shards(value: str, default_url: str) -> dict[str, str]:
+    """Lire les shards au format "nom=url,nom=url" ; par défaut un seul shard sur default_url."""
+    shards = {}
+    for item in value.split(","):
+        if item.strip():
+            name, _, url = item.strip().partition("=")
+            # Le nom doit être un identifiant simple : une URL sans nom contenant "=" est refusée
+            if not re.fullmatch(r"[A-Za-z0-9_-]+", name) or not url.strip():
+                raise ValueError(f"Shard invalide (attendu nom=url) : {item}")
+            if name in shards:
+                raise ValueError(f"Shard invalide (nom en double) : {item}")
+            shards[name] = url.strip()
+    return shards or {"default": default_url}
+
 # Configuration par défaut
+database_url = os.getenv("ARCHILOG_DATABASE_URL", "sqlite:///data.db")
 config = Config(
-    DATABASE_URL=os.getenv("ARCHILOG_DATABASE_URL", "sqlite:///data.db"),
+    DATABASE_URL=database_url,
+    # Le nom du shard (et non son URL) détermine la répartition des entrées
+    DATABASE_SHARDS=parse_shards(os.getenv("ARCHILOG_DATABASE_SHARDS", ""), database_url),
+    # À activer entre l'ajout d'un shard et la fin du rééquilibrage
+    REBALANCE_PENDING=os.getenv("ARCHILOG_REBALANCE_PENDING", "False") == "True",
     DEBUG=os.getenv("ARCHILOG_DEBUG", "False") == "True",
     SECRET_KEY=os.getenv("ARCHILOG_FLASK_SECRET_KEY", "your_secret_key_here"),
     LOG_LEVEL=os.getenv("ARCHILOG_LOG_LEVEL", "INFO")
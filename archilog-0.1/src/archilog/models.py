@@ -1,11 +1,13 @@
 import uuid
+import bisect
+import hashlib
 from dataclasses import dataclass
 from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy import create_engine, Table, MetaData, Column, String, Float, select, insert, update, delete
 from archilog import config
 
 
-engine = create_engine(config.DATABASE_URL, echo=config.DEBUG)
 metadata = MetaData()
 
 # Définir la table "entries" avec SQLAlchemy Core
@@ -37,10 +39,41 @@ class Entry:
         
         
 
+class ShardRing:
+    """Anneau de hachage cohérent associant chaque ID d'entrée à un shard."""
+
+    def __init__(self, shards: list[str], replicas: int = 100):
+        # Les points de l'anneau dépendent du nom des shards, jamais de leur URL
+        self._ring: list[tuple[int, str]] = sorted(
+            (self._hash(f"{shard}#{i}"), shard)
+            for shard in shards
+            for i in range(replicas)
+        )
+        self._keys = [key for key, _ in self._ring]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int(hashlib.md5(key.encode(), usedforsecurity=False).hexdigest(), 16)
+
+    def shard_for(self, id: uuid.UUID) -> str:
+        """Retourner le shard propriétaire de l'ID donné."""
+        index = bisect.bisect(self._keys, self._hash(id.hex)) % len(self._keys)
+        return self._ring[index][1]
+
+
+
+# Un moteur par shard, indexé par nom ; ajouter un shard ne déplace qu'une fraction des entrées
+engines = {name: create_engine(url, echo=config.DEBUG) for name, url in config.DATABASE_SHARDS.items()}
+ring = ShardRing(list(engines))
+executor = ThreadPoolExecutor(max_workers=len(engines))
+REBALANCE_BATCH_SIZE = 500
+
+
+
 @contextmanager
-def get_db():
-    """Fournir une connexion à la base de données sous forme de contexte."""
-    conn = engine.connect()
+def get_db(shard: str):
+    """Fournir une connexion au shard donné sous forme de contexte."""
+    conn = engines[shard].connect()
     trans = conn.begin()
     try:
         yield conn
@@ -53,17 +86,49 @@ def get_db():
         
         
 
+def _fan_out(func) -> list:
+    """Exécuter func(shard) en parallèle sur tous les shards, dans l'ordre des shards."""
+    if len(engines) == 1:
+        return [func(shard) for shard in engines]
+    return list(executor.map(func, engines))
+        
+        
+
+def _candidate_shards(id: uuid.UUID) -> list[str]:
+    """Shard propriétaire, suivi des autres tant qu'un rééquilibrage est en attente."""
+    owner = ring.shard_for(id)
+    if not config.REBALANCE_PENDING:
+        return [owner]
+    return [owner] + [shard for shard in engines if shard != owner]
+        
+        
+
+def _find_shard(id: uuid.UUID) -> str | None:
+    """Retourner le shard qui contient l'entrée (le propriétaire hors rééquilibrage)."""
+    candidates = _candidate_shards(id)
+    if len(candidates) == 1:
+        return candidates[0]
+    for shard in candidates:
+        with get_db(shard) as conn:
+            if conn.execute(select(entries.c.id).where(entries.c.id == id.hex)).first():
+                return shard
+    return None
+        
+        
+
 def init_db():
-    """Initialiser la base de données en créant toutes les tables."""
-    metadata.create_all(engine)
+    """Initialiser la base de données en créant toutes les tables sur chaque shard."""
+    for engine in engines.values():
+        metadata.create_all(engine)
     
     
 
 def create_entry(name: str, amount: float, category: str | None = None) -> None:
     """Créer une nouvelle entrée dans la base de données."""
-    with get_db() as conn:
+    id = uuid.uuid4()
+    with get_db(ring.shard_for(id)) as conn:
         stmt = insert(entries).values(
-            id=uuid.uuid4().hex,
+            id=id.hex,
             name=name,
             amount=amount,
             category=category
@@ -74,28 +139,40 @@ def create_entry(name: str, amount: float, category: str | None = None) -> None:
 
 def get_entry(id: uuid.UUID) -> Entry:
     """Récupérer une entrée par son ID."""
-    with get_db() as conn:
-        stmt = select(entries).where(entries.c.id == id.hex)
-        result = conn.execute(stmt).first()
-        if result:
-            return Entry.from_db(result.id, result.name, result.amount, result.category)
-        else:
-            raise Exception(f"Entrée {id} non trouvée")
+    for shard in _candidate_shards(id):
+        with get_db(shard) as conn:
+            stmt = select(entries).where(entries.c.id == id.hex)
+            result = conn.execute(stmt).first()
+            if result:
+                return Entry.from_db(result.id, result.name, result.amount, result.category)
+    raise Exception(f"Entrée {id} non trouvée")
         
         
 
 def get_all_entries() -> list[Entry]:
-    """Récupérer toutes les entrées de la base de données."""
-    with get_db() as conn:
-        stmt = select(entries)
-        results = conn.execute(stmt).fetchall()
-        return [Entry.from_db(r.id, r.name, r.amount, r.category) for r in results]
+    """Récupérer toutes les entrées de tous les shards."""
+    def fetch(shard: str) -> list[Entry]:
+        with get_db(shard) as conn:
+            stmt = select(entries)
+            results = conn.execute(stmt).fetchall()
+            return [Entry.from_db(r.id, r.name, r.amount, r.category) for r in results]
+
+    # Un rééquilibrage interrompu peut laisser un doublon : la copie du propriétaire l'emporte
+    merged: dict[uuid.UUID, Entry] = {}
+    for shard, shard_entries in zip(engines, _fan_out(fetch)):
+        for entry in shard_entries:
+            if entry.id not in merged or ring.shard_for(entry.id) == shard:
+                merged[entry.id] = entry
+    return sorted(merged.values(), key=lambda entry: (entry.name, entry.id.hex))
     
     
 
 def update_entry(id: uuid.UUID, name: str, amount: float, category: str | None) -> None:
     """Mettre à jour une entrée existante."""
-    with get_db() as conn:
+    shard = _find_shard(id)
+    if shard is None:
+        raise Exception("Aucune entrée mise à jour")
+    with get_db(shard) as conn:
         stmt = update(entries).where(entries.c.id == id.hex).values(
             name=name,
             amount=amount,
@@ -109,8 +186,52 @@ def update_entry(id: uuid.UUID, name: str, amount: float, category: str | None)
 
 def delete_entry(id: uuid.UUID) -> None:
     """Supprimer une entrée de la base de données."""
-    with get_db() as conn:
-        stmt = delete(entries).where(entries.c.id == id.hex)
-        result = conn.execute(stmt)
-        if result.rowcount == 0:
-            raise Exception("Aucune entrée supprimée")
\ No newline at end of file
+    deleted = 0
+    # Pendant un rééquilibrage, les copies hors propriétaire sont supprimées en premier :
+    # si la suppression échoue en cours de route, le rééquilibrage ne peut pas les ressusciter
+    for shard in reversed(_candidate_shards(id)):
+        with get_db(shard) as conn:
+            stmt = delete(entries).where(entries.c.id == id.hex)
+            deleted += conn.execute(stmt).rowcount
+    if deleted == 0:
+        raise Exception("Aucune entrée supprimée")
+        
+        
+
+def rebalance_shards(batch_size: int = REBALANCE_BATCH_SIZE) -> int:
+    """Déplacer chaque entrée vers son shard propriétaire et retourner le nombre d'entrées déplacées."""
+    moved = 0
+    for shard in engines:
+        last_id = ""
+        while True:
+            # Parcours par lots ordonnés sur l'ID pour ne pas charger tout le shard en mémoire
+            with get_db(shard) as conn:
+                stmt = select(entries).where(entries.c.id > last_id).order_by(entries.c.id).limit(batch_size)
+                rows = conn.execute(stmt).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            misplaced: dict[str, list] = {}
+            for row in rows:
+                owner = ring.shard_for(uuid.UUID(row.id))
+                if owner != shard:
+                    misplaced.setdefault(owner, []).append(row)
+            if not misplaced:
+                continue
+
+            # Copier avant de supprimer ; une copie déjà présente chez le propriétaire
+            # est la plus récente (get/update/delete y sont routés) et n'est pas écrasée
+            for owner, owner_rows in misplaced.items():
+                with get_db(owner) as conn:
+                    ids = [row.id for row in owner_rows]
+                    present = set(conn.execute(select(entries.c.id).where(entries.c.id.in_(ids))).scalars())
+                    absent = [dict(row._mapping) for row in owner_rows if row.id not in present]
+                    if absent:
+                        conn.execute(insert(entries), absent)
+
+            ids = [row.id for owner_rows in misplaced.values() for row in owner_rows]
+            with get_db(shard) as conn:
+                conn.execute(delete(entries).where(entries.c.id.in_(ids)))
+            moved += len(ids)
+    return moved
\ No newline at end of file
@@ -26,6 +26,13 @@ def init_db():
     models.init_db()
     click.echo("Base de données initialisée avec succès.")
 
+@cmd.cli.command("rebalance")
+def rebalance():
+    """Redistribuer les entrées entre les shards."""
+    moved = models.rebalance_shards()
+    click.echo(f"Rééquilibrage terminé: {moved} entrée(s) déplacée(s).")
+    click.echo("ARCHILOG_REBALANCE_PENDING peut être retiré de la configuration.")
+
 @cmd.cli.command("create")
 @click.option("-n", "--name", prompt="Name")
 @click.option("-a", "--amount", type=float, prompt="Amount")
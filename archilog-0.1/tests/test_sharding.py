@@ -0,0 +1,148 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+
+import archilog.models as models
+from archilog import parse_shards
+
+
+@pytest.fixture
+def shards(tmp_path, monkeypatch):
+    """Deux bases SQLite temporaires ; use(noms) active la topologie voulue."""
+    all_engines = {name: create_engine(f"sqlite:///{tmp_path / name}.db") for name in ("s0", "s1")}
+    for engine in all_engines.values():
+        models.metadata.create_all(engine)
+    executors = []
+
+    def use(*names: str, pending: bool = False):
+        executors.append(ThreadPoolExecutor(max_workers=len(names)))
+        monkeypatch.setattr(models, "engines", {name: all_engines[name] for name in names})
+        monkeypatch.setattr(models, "ring", models.ShardRing(list(names)))
+        monkeypatch.setattr(models, "executor", executors[-1])
+        monkeypatch.setattr(models.config, "REBALANCE_PENDING", pending)
+
+    yield use
+    for executor in executors:
+        executor.shutdown()
+    for engine in all_engines.values():
+        engine.dispose()
+
+
+def id_owned_by(shard: str) -> uuid.UUID:
+    """Tirer un ID dont le propriétaire est le shard donné."""
+    while True:
+        id = uuid.uuid4()
+        if models.ring.shard_for(id) == shard:
+            return id
+
+
+def put_row(shard: str, id: uuid.UUID, name: str) -> None:
+    with models.get_db(shard) as conn:
+        conn.execute(insert(models.entries).values(id=id.hex, name=name, amount=1.0, category=None))
+
+
+def rows_in(shard: str) -> dict[str, str]:
+    with models.get_db(shard) as conn:
+        return {row.id: row.name for row in conn.execute(select(models.entries))}
+
+
+def test_routing_is_stable_for_an_id():
+    ids = [uuid.uuid4() for _ in range(100)]
+    first = models.ShardRing(["s0", "s1"])
+    second = models.ShardRing(["s0", "s1"])
+    assert [first.shard_for(id) for id in ids] == [second.shard_for(id) for id in ids]
+
+
+def test_adding_a_shard_moves_only_part_of_the_keys():
+    ids = [uuid.uuid4() for _ in range(2000)]
+    before = models.ShardRing(["s0", "s1"])
+    after = models.ShardRing(["s0", "s1", "s2"])
+    moved = [id for id in ids if before.shard_for(id) != after.shard_for(id)]
+    assert 0 < len(moved) < len(ids) / 2
+    assert all(after.shard_for(id) == "s2" for id in moved)
+
+
+@pytest.mark.parametrize("value", [
+    "s0=sqlite:///a.db,s0=sqlite:///b.db",
+    "=sqlite:///a.db",
+    "sqlite:///a.db?mode=ro",
+    "s0",
+])
+def test_parse_shards_rejects_invalid_configuration(value):
+    with pytest.raises(ValueError):
+        parse_shards(value, "sqlite:///data.db")
+
+
+def test_get_all_entries_merges_shards_in_stable_order(shards):
+    shards("s0", "s1")
+    for shard, name in (("s0", "b"), ("s1", "c"), ("s1", "a"), ("s0", "b")):
+        put_row(shard, id_owned_by(shard), name)
+
+    result = models.get_all_entries()
+    assert [entry.name for entry in result] == ["a", "b", "b", "c"]
+    assert result == sorted(result, key=lambda entry: (entry.name, entry.id.hex))
+
+
+def test_single_entry_access_stays_on_owner_outside_rebalance(shards):
+    shards("s0", "s1")
+    id = id_owned_by("s1")
+    put_row("s0", id, "misplaced")
+
+    with pytest.raises(Exception):
+        models.get_entry(id)
+    with pytest.raises(Exception):
+        models.update_entry(id, "updated", 2.0, None)
+    assert rows_in("s0") == {id.hex: "misplaced"}
+
+
+def test_update_falls_back_to_old_shard_during_rebalance(shards):
+    shards("s0", "s1", pending=True)
+    id = id_owned_by("s1")
+    put_row("s0", id, "misplaced")
+
+    models.update_entry(id, "updated", 2.0, None)
+    assert rows_in("s0") == {id.hex: "updated"}
+    assert rows_in("s1") == {}
+
+
+def test_delete_during_rebalance_removes_stale_copy(shards):
+    shards("s0", "s1", pending=True)
+    id = id_owned_by("s1")
+    put_row("s0", id, "stale")
+    put_row("s1", id, "owner")
+
+    models.delete_entry(id)
+    assert models.rebalance_shards() == 0
+    assert rows_in("s0") == rows_in("s1") == {}
+    with pytest.raises(Exception):
+        models.get_entry(id)
+
+
+def test_rebalance_is_idempotent_and_keeps_owner_row(shards):
+    shards("s0")
+    for i in range(20):
+        models.create_entry(f"entry-{i}", float(i))
+    shards("s0", "s1", pending=True)
+    moving = [uuid.UUID(id) for id in rows_in("s0") if models.ring.shard_for(uuid.UUID(id)) == "s1"]
+    if not moving:
+        moving = [id_owned_by("s1")]
+        put_row("s0", moving[0], "entry-extra")
+
+    # Avant le rééquilibrage, les accès unitaires retrouvent l'entrée sur l'ancien shard
+    assert models.get_entry(moving[0]).name.startswith("entry-")
+
+    # Rééquilibrage interrompu : copie présente chez le propriétaire puis modifiée
+    stale = moving[0]
+    with models.get_db("s0") as conn:
+        row = conn.execute(select(models.entries).where(models.entries.c.id == stale.hex)).first()
+    with models.get_db("s1") as conn:
+        conn.execute(insert(models.entries).values(**row._mapping))
+    models.update_entry(stale, "updated", 42.0, None)
+
+    assert models.rebalance_shards(batch_size=3) == len(moving)
+    assert models.rebalance_shards(batch_size=3) == 0
+    assert models.get_entry(stale).name == "updated"
+    assert set(rows_in("s1")) == {id.hex for id in moving}
+    assert len(models.get_all_entries()) == len(rows_in("s0")) + len(moving)